@@ -1,15 +1,153 @@
-import json
 import asyncio
+import orjson
 from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.layers import get_channel_layer
 from .services.redis_service import RedisService
+from .services.chat_service import ChatService
 from functools import wraps
 
+# Game state holds dicts with int keys (e.g. ships left per length),
+# which orjson only encodes with this option, as the stdlib json did.
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+# Lifetime of a user's `online_{username}` key in seconds.
+ONLINE_TTL = 30
+
+# Seconds a disconnected user's lobby chats are kept before the cleanup
+# checks whether they became inactive.
+LOBBY_CHAT_CLEANUP_DELAY = 30
+
+# Users waiting for the next lobby chat cleanup, each mapped to the
+# channel names to drop from their inactive chat groups.
+_pending_chat_cleanup = {}
+
+# This process's lobby chat cleaner, running while users are pending.
+_chat_cleaner = None
+
+# Strong references to running background tasks. The event loop only
+# keeps weak ones, so an untracked task may be collected mid-sleep.
+_BACKGROUND = set()
+
+def spawn(coro):
+    """
+    Start a background task and keep a reference to it until it finishes.
+
+    Args:
+        coro (Coroutine): The coroutine to run.
+
+    Returns:
+        asyncio.Task: The started task.
+    """
+    task = asyncio.create_task(coro)
+    _BACKGROUND.add(task)
+    task.add_done_callback(_BACKGROUND.discard)
+    return task
+
+def schedule_lobby_chat_cleanup(username, channel_name):
+    """
+    Queue a user's lobby chats for the next cleanup and start the
+        cleaner if it is not running.
+    Repeated disconnects of the same user share a single check.
+
+    Args:
+        username (str): The disconnected user.
+        channel_name (str): The disconnected channel.
+    """
+    global _chat_cleaner
+    _pending_chat_cleanup.setdefault(username, set()).add(channel_name)
+    if _chat_cleaner is None or _chat_cleaner.done():
+        _chat_cleaner = spawn(clean_lobby_chats())
+
+async def clean_lobby_chats():
+    """
+    Cleans up the lobby chats of pending users until none are left.
+    Each round takes the users queued so far, waits
+        `LOBBY_CHAT_CLEANUP_DELAY` and then checks all of them at once.
+    """
+    while _pending_chat_cleanup:
+        pending = dict(_pending_chat_cleanup)
+        _pending_chat_cleanup.clear()
+        await asyncio.sleep(LOBBY_CHAT_CLEANUP_DELAY)
+        await cleanup_lobby_chats(pending)
+
+async def cleanup_lobby_chats(pending):
+    """
+    Delete the lobby chats of the given users whose members are all
+        offline, and drop the users' channels from those chat groups.
+    All chat sets, online checks and deletes are batched into one
+        pipeline each.
+
+    Args:
+        pending (dict[str, set[str]]): Usernames mapped to their
+            disconnected channel names.
+    """
+    usernames = list(pending)
+    async with RedisService.pipeline() as pipe:
+        for username in usernames:
+            pipe.smembers(f"lobby_chats:{username}")
+        user_chats = dict(zip(usernames, await pipe.execute()))
+
+    chat_players = {
+        chat_id: chat_id.split("_")
+        for chats in user_chats.values()
+        for chat_id in chats
+    }
+    if not chat_players:
+        return
+
+    # Disconnected users are checked too, since they may have
+    # reconnected during the delay.
+    players = list({
+        player
+        for chat_members in chat_players.values()
+        for player in chat_members
+    })
+    values = await RedisService.get_many(
+        [f"online_{player}" for player in players]
+    )
+    online = dict(zip(players, values))
+
+    inactive = {
+        chat_id for chat_id, players in chat_players.items()
+        if not any(online.get(player) for player in players)
+    }
+    if not inactive:
+        return
+
+    # Redis drops a set once its last member is removed, so emptied
+    # `lobby_chats:{player}` sets need no explicit delete.
+    async with RedisService.pipeline() as pipe:
+        for chat_id in inactive:
+            pipe.delete(chat_id)
+            for player in chat_players[chat_id]:
+                pipe.srem(f"lobby_chats:{player}", chat_id)
+        await pipe.execute()
+
+    channel_layer = get_channel_layer()
+    await asyncio.gather(*(
+        channel_layer.group_discard(chat_id, channel_name)
+        for username, chats in user_chats.items()
+        for chat_id in chats
+        if chat_id in inactive
+        for channel_name in pending[username]
+    ))
+
 class BaseConsumer(AsyncWebsocketConsumer):
     """
     Base WebSocket consumer providing common functionality for other consumers.
     Handles JSON sending, TTL refreshing for online users, and chat cleanup.
     """
 
+    def cache_user_keys(self):
+        """
+        Build the user-specific names used on every action once,
+            instead of formatting them on each Redis or group call.
+        """
+        username = self.user.username
+        self._username_upper = username.upper()
+        self._online_key = f"online_{username}"
+        self._user_group = f"user_{username}"
+
     async def send_json(self, data: dict):
         """
         Send a JSON-encoded message to the WebSocket client.
@@ -17,57 +155,73 @@ class BaseConsumer(AsyncWebsocketConsumer):
         Args:
             data (dict): The data to send.
         """
-        await self.send(text_data=json.dumps(data))
+        payload = orjson.dumps(data, option=JSON_OPTIONS)
+        await self.send(text_data=payload.decode())
+
+    async def send_chat_history_of(self, chat_id):
+        """
+        Send the stored history of a chat to the WebSocket client.
+        The stored messages are already JSON, so they are joined into
+            the frame as they are instead of being decoded and re-encoded.
+
+        Args:
+            chat_id (str): The unique identifier for the chat.
+        """
+        history = await ChatService.get_history(chat_id)
+        await self.send(
+            text_data='{"type":"chat_history","history":['
+            + ",".join(history)
+            + "]}"
+        )
+
+    async def group_send_many(self, messages):
+        """
+        Send several channel layer group messages concurrently,
+            so their round trips overlap instead of running one by one.
+
+        Args:
+            messages (list[tuple[str, dict]]): Pairs of group name
+                and message to send to that group.
+        """
+        await asyncio.gather(*(
+            self.channel_layer.group_send(group, message)
+            for group, message in messages
+        ))
 
     async def refresh_user_ttl(self):
         """
         Refresh the TTL (Time-To-Live) for the current user's online status
             in Redis.
         Keeps the user marked as 'online' for a set time.
+        Writes are throttled to one per third of the TTL, so frequent
+            actions do not issue a Redis write each.
         """
-        await RedisService.set_with_ttl(f"online_{self.user.username}")
+        now = asyncio.get_running_loop().time()
+        if (
+            self._last_ttl_refresh is not None
+            and now - self._last_ttl_refresh < ONLINE_TTL / 3
+        ):
+            return
 
-    async def cleanup_lobby_chat(self):
+        self._last_ttl_refresh = now
+        await RedisService.set_with_ttl(self._online_key, ex=ONLINE_TTL)
+
+    def cleanup_lobby_chat(self):
         """
-        Clean up inactive lobby chat groups.
-        - Waits 30 seconds before checking for active users.
-        - If no users remain active in a chat, deletes it from Redis
-            and unsubscribes the channel.
+        Schedule a cleanup of the user's inactive lobby chats.
+        After `LOBBY_CHAT_CLEANUP_DELAY` seconds, chats with no online
+            members are deleted from Redis and the channel is
+            unsubscribed from them.
         """
-        await asyncio.sleep(30)
-        username = self.user.username
-        chats = await RedisService.get_set(f"lobby_chats:{username}")
-
-        for chat_id in chats:
-            players = chat_id.split("_")
-            active = False
-            for player in players:
-                if (
-                    player != username
-                    and await RedisService.exists(f"online_{player}")
-                ):
-                    active = True
-                    break
-
-            if not active:
-                await RedisService.delete(chat_id)
-                await self.channel_layer.group_discard(
-                    chat_id,
-                    self.channel_name
-                )
-                for player in players:
-                    await RedisService.remove_from_set(
-                        f"lobby_chats:{player}",
-                        chat_id
-                    )
-                    if not await RedisService.get_set(f"lobby_chats:{player}"):
-                        await RedisService.delete(f"lobby_chats:{player}")
+        schedule_lobby_chat_cleanup(self.user.username, self.channel_name)
 
     @staticmethod
     def refresh_ttl_on_action(func):
         """
-        Decorator for refreshing user TTL before executing an action.
+        Decorator for refreshing user TTL while executing an action.
         Ensures the user stays marked as online when performing an action.
+        The refresh does not affect the action, so both run concurrently
+            and their Redis round trips overlap.
 
         Args:
             func (Callable): The function to wrap.
@@ -77,6 +231,9 @@ class BaseConsumer(AsyncWebsocketConsumer):
         """
         @wraps(func)
         async def wrapper(self, *args, **kwargs):
-            await self.refresh_user_ttl()
-            return await func(self, *args, **kwargs)
+            _, result = await asyncio.gather(
+                self.refresh_user_ttl(),
+                func(self, *args, **kwargs)
+            )
+            return result
         return wrapper
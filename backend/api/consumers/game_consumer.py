@@ -1,11 +1,38 @@
-import json
 import asyncio
-from .base_consumer import BaseConsumer
+import contextlib
+import orjson
+from .base_consumer import BaseConsumer, JSON_OPTIONS, spawn
 from .services.redis_service import RedisService
 from .services.chat_service import ChatService
 from .services.game_service import GameService
 from ..game_engine import game_engine
 
+# Channel layer events shared by every send, built once.
+GAME_INIT_EVENT = {"type": "game.init"}
+SEND_RESTART_EVENT = {"type": "send.restart"}
+
+def encode_frame(frame_type, payload):
+    """
+    Encode a client frame once, so it can be passed through the channel
+        layer as text. Game state has int-keyed dicts, which the channel
+        layer's msgpack decoding rejects.
+
+    Args:
+        frame_type (str): Value of the frame's `type` field.
+        payload (dict): Remaining fields of the frame.
+
+    Returns:
+        str: The JSON-encoded frame.
+    """
+    return orjson.dumps(
+        {"type": frame_type, **payload},
+        option=JSON_OPTIONS
+    ).decode()
+
+# Reconnect signals for players with a pending delayed leave,
+# keyed by (game_id, username).
+_reconnect_events = {}
+
 class GameConsumer(BaseConsumer):
     """
     WebSocket consumer that handles real-time multiplayer game communication.
@@ -14,6 +41,18 @@ class GameConsumer(BaseConsumer):
     Uses Redis and internal game engine for state tracking.
     """
 
+    # Maps client actions to handler method names.
+    _ACTIONS = {
+        "place_ship": "action_place_ship",
+        "remove_ship": "action_remove_ship",
+        "set_ready": "action_set_ready",
+        "make_move": "action_make_move",
+        "restart_game": "action_restart_game",
+        "send_msg": "action_send_msg",
+        "ping": "action_ping",
+        "leave_game": "action_leave_game"
+    }
+
     async def connect(self):
         """
         Handles a new WebSocket connection.
@@ -23,23 +62,21 @@ class GameConsumer(BaseConsumer):
         """
         self.user = self.scope["user"]
         self.connected_to_game = False
+        self._last_state_frame = None
+        self._last_ttl_refresh = None
 
         if not self.user.is_authenticated:
             return
 
+        self.cache_user_keys()
         self.game_id = self.scope["url_route"]["kwargs"]["game_id"]
+        self._game_chat_key = f"gamechat:{self.game_id}"
         game = game_engine.get_game(self.game_id)
-        status = await GameService.get_player_status(
+        status = await GameService.get_or_init_player_status(
             self.game_id,
             self.user.username
         )
 
-        if not status:
-            status = await GameService.init_player_status(
-                self.game_id,
-                self.user.username
-            )
-
         await self.accept()
 
         if (
@@ -51,24 +88,28 @@ class GameConsumer(BaseConsumer):
             return
 
         self.connected_to_game = True
-        await self.channel_layer.group_add(
-            self.game_id,
-            self.channel_name
+        # Players never change during a game, including rematches.
+        self._players = tuple(sorted(game["players"]))
+        reconnect_event = _reconnect_events.pop(
+            (self.game_id, self.user.username),
+            None
         )
+        if reconnect_event:
+            reconnect_event.set()
 
-        await self.set_temp_disconnect(False)
-        await RedisService.incr_user_connections("game", self.user.username)
-        await self.refresh_user_ttl()
-
-        await self.channel_layer.group_send(
-            self.game_id,
-            {"type": "game.update"}
-        )
-        await self.channel_layer.group_send(
-            self.game_id,
-            {"type": "send.chat.history"}
+        await asyncio.gather(
+            self.channel_layer.group_add(
+                self.game_id,
+                self.channel_name
+            ),
+            self.set_temp_disconnect(False),
+            RedisService.incr_user_connections("game", self.user.username),
+            self.refresh_user_ttl()
         )
 
+        # Sent only after joining the group, so this client receives it.
+        await self.channel_layer.group_send(self.game_id, GAME_INIT_EVENT)
+
     async def disconnect(self, close_code):
         """
         Handles WebSocket disconnection.
@@ -78,17 +119,25 @@ class GameConsumer(BaseConsumer):
         if not self.user.is_authenticated or not self.connected_to_game:
             return
 
-        await self.channel_layer.group_discard(
-            self.game_id,
-            self.channel_name
+        await asyncio.gather(
+            self.channel_layer.group_discard(
+                self.game_id,
+                self.channel_name
+            ),
+            self.set_temp_disconnect(True)
+        )
+        self.reconnect_event = _reconnect_events.setdefault(
+            (self.game_id, self.user.username),
+            asyncio.Event()
         )
-        await self.set_temp_disconnect(True)
-        self.delayed_task = asyncio.create_task(self.delayed_leave())
+        self.delayed_task = spawn(self.delayed_leave())
 
     async def delayed_leave(self):
         """
-        Waits 10 seconds before treating disconnect as permanent,
+        Waits up to 10 seconds before treating disconnect as permanent,
         allowing short disconnects to recover.
+        Returns early, only releasing the connection count, if the player
+            reconnects while waiting.
         """
         status = await GameService.get_player_status(
             self.game_id,
@@ -99,12 +148,30 @@ class GameConsumer(BaseConsumer):
                 "game",
                 self.user.username
             )
-            print(f"Remaining {remaining}, Full")
             if remaining == 0:
                 await self.handle_full_disconnect()
         else:
-            await asyncio.sleep(10)
-            
+            try:
+                await asyncio.wait_for(
+                    self.reconnect_event.wait(),
+                    timeout=10
+                )
+                reconnected = True
+            except asyncio.TimeoutError:
+                reconnected = False
+            finally:
+                key = (self.game_id, self.user.username)
+                if _reconnect_events.get(key) is self.reconnect_event:
+                    del _reconnect_events[key]
+
+            if reconnected:
+                # The new connection took over, so this one just ends.
+                await RedisService.decr_user_connections(
+                    "game",
+                    self.user.username
+                )
+                return
+
             status = await GameService.get_player_status(
                 self.game_id,
                 self.user.username
@@ -114,46 +181,42 @@ class GameConsumer(BaseConsumer):
                 self.user.username
             )
             if status["temp_disconnect"]:
-                print(f"Remaining {remaining}, Temp")
                 if remaining == 0:
-                    await self.set_full_disconnect(True)
                     await self.handle_full_disconnect()
 
     async def handle_full_disconnect(self):
         """
-        Handles a full disconnect: removes player from game group,
-            sends notifications, and ends game if both players have left.
+        Handles a full disconnect: marks the player as fully
+            disconnected, sends notifications, and ends game if both
+            players have left.
         """
         if (
             hasattr(self, "delayed_task")
             and self.delayed_task is not asyncio.current_task()
         ):
-            print("Has attr delayed_task")
             self.delayed_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.delayed_task
 
-        if await GameService.all_status_true(
+        if await GameService.leave_game(
             self.game_id,
-            "full_disconnect"
+            self.user.username,
+            self._game_chat_key
         ):
-            print("All full disconnect")
-            await ChatService.delete_chat(f"gamechat:{self.game_id}")
-            await GameService.delete_game_status(self.game_id)
             game_engine.end_game(self.game_id)
             return
 
-        print("Sending Left Message")
-        await self.push_message(
-            "system",
-            f"{str(self.user.username).upper()} HAS LEFT THE GAME",
-            "public"
-        )
-        await self.channel_layer.group_send(
-            self.game_id,
-            {"type": "game.update"}
+        await asyncio.gather(
+            self.push_message(
+                "system",
+                f"{self._username_upper} HAS LEFT THE GAME",
+                "public"
+            ),
+            self.group_send_game_update()
         )
-        asyncio.create_task(self.cleanup_lobby_chat())
+        self.cleanup_lobby_chat()
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """
         Handles messages received from WebSocket client.
         Dispatches the action based on a predefined map.
@@ -161,28 +224,15 @@ class GameConsumer(BaseConsumer):
         if not self.user.is_authenticated:
             return
 
-        data = json.loads(text_data)
+        data = orjson.loads(text_data or bytes_data)
 
         action = data.get("action")
         if not action:
             return
 
-        actions_map = {
-            "place_ship": self.action_place_ship,
-            "remove_ship": self.action_remove_ship,
-            "set_ready": self.action_set_ready,
-            "make_move": self.action_make_move,
-            "restart_game": self.action_restart_game,
-            "send_msg": self.action_send_msg,
-            "ping": self.action_ping,
-            "leave_game": self.action_leave_game
-        }
-
-        handler = actions_map.get(action)
-        if handler:
-            await handler(data)
-        else:
-            return
+        handler_name = self._ACTIONS.get(action)
+        if handler_name:
+            await getattr(self, handler_name)(data)
 
     @BaseConsumer.refresh_ttl_on_action
     async def action_place_ship(self, data):
@@ -198,15 +248,11 @@ class GameConsumer(BaseConsumer):
             data["orientation"]
         )
 
-        await self.push_message(
+        await self.push_snapshot(
             "system",
             result["result"],
             result["access"]
         )
-        await self.channel_layer.group_send(
-            self.game_id,
-            {"type": "game.update"}
-        )
 
     @BaseConsumer.refresh_ttl_on_action
     async def action_remove_ship(self, data):
@@ -220,15 +266,11 @@ class GameConsumer(BaseConsumer):
             data["y"]
         )
 
-        await self.push_message(
+        await self.push_snapshot(
             "system",
             result["result"],
             result["access"]
         )
-        await self.channel_layer.group_send(
-            self.game_id,
-            {"type": "game.update"}
-        )
 
     @BaseConsumer.refresh_ttl_on_action
     async def action_set_ready(self, data):
@@ -240,15 +282,11 @@ class GameConsumer(BaseConsumer):
             self.user.username
         )
 
-        await self.push_message(
+        await self.push_snapshot(
             "system",
             result["result"],
             result["access"]
         )
-        await self.channel_layer.group_send(
-            self.game_id,
-            {"type": "game.update"}
-        )
 
     @BaseConsumer.refresh_ttl_on_action
     async def action_make_move(self, data):
@@ -262,15 +300,16 @@ class GameConsumer(BaseConsumer):
             data["y"]
         )
 
-        await self.channel_layer.group_send(
-            self.game_id,
-            {"type": "game.update"}
-        )
-        await self.push_message(
-            "system",
-            result["result"],
-            result["access"]
-        )
+        # A rejected move changes nothing but the chat.
+        if "value" not in result:
+            await self.push_message(
+                "system",
+                result["result"],
+                result["access"]
+            )
+            return
+
+        await self.push_move(result)
 
     @BaseConsumer.refresh_ttl_on_action
     async def action_restart_game(self, data):
@@ -282,33 +321,27 @@ class GameConsumer(BaseConsumer):
         if not game:
             return
 
-        player1, player2 = sorted(game["players"])
+        player1, player2 = self._players
         if not (game["ready"][player1] and game["ready"][player2]):
             return
 
-        await self.set_restart(self.user.username, True)
-        await self.push_message(
-                "system",
-                f"{str(self.user.username).upper()} HAS VOTED FOR A REMATCH",
-                "public"
-            )
-        await self.channel_layer.group_send(
-                self.game_id,
-                {"type": "game.update"}
-            )
+        restart = await GameService.vote_restart(
+            self.game_id,
+            self.user.username
+        )
+        await self.push_snapshot(
+            "system",
+            f"{self._username_upper} HAS VOTED FOR A REMATCH",
+            "public"
+        )
 
-        if await GameService.all_status_true(self.game_id, "restart"):
+        if restart:
             await self.channel_layer.group_send(
                 self.game_id,
-                {"type": "send.restart"}
+                SEND_RESTART_EVENT
             )
-            await self.set_restart(player1, False)
-            await self.set_restart(player2, False)
             game_engine.create_game(self.game_id, player1, player2)
-            await self.channel_layer.group_send(
-                self.game_id,
-                {"type": "game.update"}
-            )
+            await self.group_send_game_update()
 
     @BaseConsumer.refresh_ttl_on_action
     async def action_send_msg(self, data):
@@ -317,57 +350,151 @@ class GameConsumer(BaseConsumer):
         """
         await self.push_message(data["sender"], data["msg"], data["access"])
 
-    @BaseConsumer.refresh_ttl_on_action
     async def action_ping(self, data):
         """
         Ping from client to keep user's lobby chat history.
         """
-        pass
+        await self.refresh_user_ttl()
 
     async def action_leave_game(self, data):
         """
         Marks user as fully disconnected on leave action.
         """
         await self.set_full_disconnect(True)
-        await self.channel_layer.group_send(
-            self.game_id,
-            {"type": "game.update"}
-        )
+        await self.group_send_game_update()
 
     async def send_game_state(self):
         """
         Sends the full game state to the connected client.
         Includes both game and opponent status.
         """
-        state = game_engine.get_game_state(
+        state = await self.get_game_state()
+        await self.send_state_frame(encode_frame("game_state", state))
+
+    async def send_state_frame(self, frame):
+        """
+        Sends an encoded game state frame to the connected client.
+        Skipped if the frame is identical to the last one sent,
+            as the client already has it.
+
+        Args:
+            frame (str): The encoded `game_state` frame.
+        """
+        if frame == self._last_state_frame:
+            return
+
+        self._last_state_frame = frame
+        await self.send(text_data=frame)
+
+    async def get_game_state(self):
+        """
+        Builds the game state for the connected client.
+
+        Returns:
+            dict: Game state, players' disconnect flags and
+                the player's restart flag.
+        """
+        statuses = await self.get_player_statuses()
+        return self.build_game_state(self.user.username, statuses)
+
+    async def get_game_states(self):
+        """
+        Builds the game state of both players with a single status read,
+            so receivers of a broadcast do not rebuild it themselves.
+
+        Returns:
+            dict[str, dict]: Each player mapped to their game state.
+        """
+        statuses = await self.get_player_statuses()
+        return {
+            player: self.build_game_state(player, statuses)
+            for player in self._players
+        }
+
+    async def get_player_statuses(self):
+        """
+        Reads the status flags shown to clients for both players.
+
+        Returns:
+            dict[str, dict]: Each player mapped to their `full_disconnect`
+                and `restart` flags.
+        """
+        return await GameService.get_flags(
             self.game_id,
-            self.user.username
+            self._players,
+            ("full_disconnect", "restart")
         )
 
-        players_status = await RedisService.get_all_hash(self.game_id)
-        parsed_status = {p: json.loads(s) for p, s in players_status.items()}
+    def build_game_state(self, player, statuses):
+        """
+        Builds the game state from the given player's perspective.
 
-        players_disconnect = {
-            player: status.get("full_disconnect", False)
-            for player, status in parsed_status.items()
+        Args:
+            player (str): Player username.
+            statuses (dict[str, dict]): All players' status dictionaries.
+
+        Returns:
+            dict: Game state, players' disconnect flags and
+                the player's restart flag.
+        """
+        return {
+            "state": game_engine.get_game_state(self.game_id, player),
+            "players_disconnect": {
+                name: status["full_disconnect"]
+                for name, status in statuses.items()
+            },
+            "player_restart": statuses[player]["restart"]
         }
 
-        player_restart = parsed_status.get(self.user.username, {}).get(
-            "restart", False
+    async def group_send_game_update(self):
+        """
+        Broadcasts a game update carrying both players' encoded states.
+        """
+        states = await self.get_game_states()
+        await self.channel_layer.group_send(
+            self.game_id,
+            {
+                "type": "game.update",
+                "frames": {
+                    player: encode_frame("game_state", state)
+                    for player, state in states.items()
+                }
+            }
         )
 
-        await self.send_json({
-            "type": "game_state",
-            "state": state,
-            "players_disconnect": players_disconnect,
-            "player_restart": player_restart
-        })
+    async def game_init(self, event):
+        """
+        Called on `game.init` event when a player connects.
+        Sends the game state and the chat history, fetched concurrently.
+        """
+        await asyncio.gather(
+            self.send_game_state(),
+            self.send_chat_history(event)
+        )
 
     async def game_update(self, event):
         """
         Called on `game.update` event to push updated game state.
+        Sends the frame the sender built for this player.
+        """
+        await self.send_state_frame(event["frames"][self.user.username])
+
+    async def game_snapshot(self, event):
+        """
+        Called on `game.snapshot` event to push the updated game state
+            together with the new chat message in a single frame.
+        """
+        # The client's state no longer matches the last full frame.
+        self._last_state_frame = None
+        await self.send(text_data=event["frames"][self.user.username])
+
+    async def game_move(self, event):
+        """
+        Called on `game.move` event to push a single shot to the client,
+            which patches its board instead of receiving the full state.
         """
-        await self.send_game_state()
+        self._last_state_frame = None
+        await self.send(text_data=event["frame"])
 
     async def player_left(self, event):
         """
@@ -388,11 +515,17 @@ class GameConsumer(BaseConsumer):
     async def send_chat_history(self, event):
         """
         Sends full chat history for the game.
+        Used when a client connects; new messages follow as appends.
+        """
+        await self.send_chat_history_of(self._game_chat_key)
+
+    async def send_chat_append(self, event):
+        """
+        Sends a single new chat message to the client.
         """
-        history = await ChatService.get_history(f"gamechat:{self.game_id}")
         await self.send_json({
-            "type": "chat_history",
-            "history": history
+            "type": "chat_append",
+            "message": event["message"]
         })
 
     async def push_message(self, msg_type, msg, msg_access):
@@ -404,18 +537,87 @@ class GameConsumer(BaseConsumer):
             msg (str): Message content.
             msg_access (str): Visibility of the message ("public"/"private").
         """
-        await ChatService.push_message(
-            f"gamechat:{self.game_id}",
+        message = await self.store_message(msg_type, msg, msg_access)
+        await self.channel_layer.group_send(
+            self.game_id,
+            {"type": "send.chat.append", "message": message}
+        )
+
+    async def store_message(self, msg_type, msg, msg_access):
+        """
+        Store a new message in the game chat.
+
+        Args:
+            msg_type (str): Type of message ("system" or "user").
+            msg (str): Message content.
+            msg_access (str): Visibility of the message ("public"/"private").
+
+        Returns:
+            dict: The stored message.
+        """
+        message = {
+            "from": self.user.username,
+            "msg_type": msg_type,
+            "msg": msg,
+            "access": msg_access
+        }
+        await ChatService.push_message(self._game_chat_key, message)
+        return message
+
+    async def push_snapshot(self, msg_type, msg, msg_access):
+        """
+        Push a new message to the chat and broadcast it to all players
+            along with the updated game state, as one event.
+
+        Args:
+            msg_type (str): Type of message ("system" or "user").
+            msg (str): Message content.
+            msg_access (str): Visibility of the message ("public"/"private").
+        """
+        message, states = await asyncio.gather(
+            self.store_message(msg_type, msg, msg_access),
+            self.get_game_states()
+        )
+        await self.channel_layer.group_send(
+            self.game_id,
             {
-                "from": self.user.username,
-                "msg_type": msg_type,
-                "msg": msg,
-                "access": msg_access
+                "type": "game.snapshot",
+                "frames": {
+                    player: encode_frame(
+                        "snapshot",
+                        {"state": state, "chat_append": message}
+                    )
+                    for player, state in states.items()
+                }
             }
         )
+
+    async def push_move(self, result):
+        """
+        Push the move's message to the chat and broadcast the move
+            as a small delta along with it, as one event.
+
+        Args:
+            result (dict): Accepted move result from the game engine.
+        """
+        message = await self.store_message(
+            "system",
+            result["result"],
+            result["access"]
+        )
+        frame = encode_frame("move", {
+            "shooter": self.user.username,
+            "x": result["x"],
+            "y": result["y"],
+            "value": result["value"],
+            "sunk": result["sunk"],
+            "turn": result["next_turn"],
+            "winner": result["winner"],
+            "chat_append": message
+        })
         await self.channel_layer.group_send(
             self.game_id,
-            {"type": "send.chat.history"}
+            {"type": "game.move", "frame": frame}
         )
 
     async def set_temp_disconnect(self, value: bool):
@@ -439,14 +641,3 @@ class GameConsumer(BaseConsumer):
             "full_disconnect",
             value
         )
-
-    async def set_restart(self, player, value: bool):
-        """
-        Set restart flag for both players.
-        """
-        await GameService.set_status(
-            self.game_id,
-            player,
-            "restart",
-            value
-        )
\ No newline at end of file
@@ -1,13 +1,57 @@
-import json
 import asyncio
-from .base_consumer import BaseConsumer
+import orjson
+from channels.layers import get_channel_layer
+from .base_consumer import BaseConsumer, spawn
 from .services.redis_service import RedisService
 from .services.chat_service import ChatService
-from .services.invite_service import InviteService
+from .services.invite_service import InviteService, INVITE_TTL
 from .services.lobby_service import LobbyService
 from .services.game_service import GameService
 from ..game_engine import game_engine
 
+# Extra wait past the invite TTL, so Redis has expired the keys
+# by the time the watcher resends the invite states.
+INVITE_EXPIRY_GRACE = 1
+
+# Seconds between sweeps of stale lobby presence entries.
+LOBBY_SWEEP_INTERVAL = 30
+
+# This process's presence sweeper, started by the first lobby connection.
+_sweeper = None
+
+async def broadcast_user_list(channel_layer):
+    """
+    Sends the current user list to all lobby users.
+    The list is read and encoded once here, and every receiver
+        forwards the same payload.
+    """
+    users = await LobbyService.get_users()
+    payload = orjson.dumps({"type": "user_list", "users": users})
+    await channel_layer.group_send(
+        "lobby_users",
+        {"type": "send.user.list", "payload": payload.decode()}
+    )
+
+async def sweep_lobby_users():
+    """
+    Periodically removes stale users from the lobby presence set
+        and, if any were removed, updates the lobby user list.
+    """
+    channel_layer = get_channel_layer()
+    while True:
+        await asyncio.sleep(LOBBY_SWEEP_INTERVAL)
+        if await LobbyService.remove_stale_users():
+            await broadcast_user_list(channel_layer)
+
+def ensure_lobby_sweeper():
+    """
+    Starts the presence sweeper if it is not running yet,
+        or restarts it if it stopped.
+    """
+    global _sweeper
+    if _sweeper is None or _sweeper.done():
+        _sweeper = spawn(sweep_lobby_users())
+
 class LobbyConsumer(BaseConsumer):
     """
     Handles WebSocket communication in the lobby.
@@ -15,6 +59,16 @@ class LobbyConsumer(BaseConsumer):
         game initiation.
     """
 
+    # Maps client actions to handler method names.
+    _ACTIONS = {
+        "invite": "action_invite",
+        "invite_response": "action_invite_response",
+        "invite_cancel": "action_invite_cancel",
+        "send_msg": "action_send_msg",
+        "join_chat": "action_join_chat",
+        "ping": "action_ping"
+    }
+
     async def connect(self):
         """
         Handles a new WebSocket connection.
@@ -22,11 +76,20 @@ class LobbyConsumer(BaseConsumer):
             and notifies others about the updated lobby user list.
         """
         self.user = self.scope["user"]
+        self._invite_events = {}
+        self._chat_id_cache = {}
+        self._last_ttl_refresh = None
 
         if not self.user.is_authenticated:
             return
 
+        self.cache_user_keys()
+        ensure_lobby_sweeper()
         await self.accept()
+        await self.send_json({
+            "type": "self",
+            "username": self.user.username
+        })
 
         game_id = await self.find_game_id()
         if game_id:
@@ -40,20 +103,23 @@ class LobbyConsumer(BaseConsumer):
                     "game_id": game_id
                 })
 
-        await self.channel_layer.group_add(
-            "lobby_users",
-            self.channel_name
-        )
-        await self.channel_layer.group_add(
-            f"user_{self.user.username}",
-            self.channel_name
+        await asyncio.gather(
+            self.channel_layer.group_add(
+                "lobby_users",
+                self.channel_name
+            ),
+            self.channel_layer.group_add(self._user_group, self.channel_name),
+            LobbyService.add_user(self.user.username),
+            self.refresh_user_ttl(),
+            RedisService.incr_user_connections("lobby", self.user.username)
         )
 
-        await LobbyService.add_user(self.user.username)
-        await self.refresh_user_ttl()
-        await RedisService.incr_user_connections("lobby", self.user.username)
-        await self.group_send_user_list()
-        await self.send_invite_state()
+        # The user list is broadcast only once the user is stored and
+        # subscribed, so it includes and reaches this client.
+        await asyncio.gather(
+            self.group_send_user_list(),
+            self.send_invite_state()
+        )
 
     async def disconnect(self, close_code):
         """
@@ -63,25 +129,23 @@ class LobbyConsumer(BaseConsumer):
         if not self.user.is_authenticated:
             return
 
-        await self.channel_layer.group_discard(
-            "lobby_users",
-            self.channel_name
-        )
-        await self.channel_layer.group_discard(
-            f"user_{self.user.username}",
-            self.channel_name
-        )
-
-        remaining = await RedisService.decr_user_connections(
-            "lobby",
-            self.user.username
+        _, _, remaining = await asyncio.gather(
+            self.channel_layer.group_discard(
+                "lobby_users",
+                self.channel_name
+            ),
+            self.channel_layer.group_discard(
+                self._user_group,
+                self.channel_name
+            ),
+            RedisService.decr_user_connections("lobby", self.user.username)
         )
         if remaining == 0:
             await LobbyService.remove_user(self.user.username)
             await self.group_send_user_list()
-            asyncio.create_task(self.cleanup_lobby_chat())
+            self.cleanup_lobby_chat()
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """
         Handles messages received from WebSocket client.
         Dispatches the action based on a predefined map.
@@ -89,26 +153,15 @@ class LobbyConsumer(BaseConsumer):
         if not self.user.is_authenticated:
             return
         
-        data = json.loads(text_data)
+        data = orjson.loads(text_data or bytes_data)
 
         action = data.get("action")
         if not action:
             return
 
-        actions_map = {
-            "invite": self.action_invite,
-            "invite_response": self.action_invite_response,
-            "invite_cancel": self.action_invite_cancel,
-            "send_msg": self.action_send_msg,
-            "join_chat": self.action_join_chat,
-            "ping": self.action_ping
-        }
-
-        handler = actions_map.get(action)
-        if handler:
-            await handler(data)
-        else:
-            return
+        handler_name = self._ACTIONS.get(action)
+        if handler_name:
+            await getattr(self, handler_name)(data)
 
     @BaseConsumer.refresh_ttl_on_action
     async def action_invite(self, data):
@@ -120,18 +173,14 @@ class LobbyConsumer(BaseConsumer):
         if not to_user:
             return
 
-        await InviteService.add_invite(username, to_user)
+        states = await InviteService.add_invite(username, to_user)
 
-        asyncio.create_task(self.schedule_invite_watch(username, to_user))
+        self.stop_invite_watch(username, to_user)
+        event = asyncio.Event()
+        self._invite_events[(username, to_user)] = event
+        spawn(self.schedule_invite_watch(username, to_user, event))
 
-        await self.channel_layer.group_send(
-            f"user_{username}",
-            {"type": "group.send.invite.state"}
-        )
-        await self.channel_layer.group_send(
-            f"user_{to_user}",
-            {"type": "group.send.invite.state"}
-        )
+        await self.group_send_invite_state_map(states)
 
 
     @BaseConsumer.refresh_ttl_on_action
@@ -146,42 +195,33 @@ class LobbyConsumer(BaseConsumer):
         if not from_user or not status:
             return
 
-        await InviteService.remove_invite(from_user, username)
+        states = await InviteService.remove_invite(from_user, username)
 
         if status == "accepted":
-            await self.channel_layer.group_send(
-                f"user_{from_user}",
-                {
-                    "type": "send.invite.accepted",
-                    "from": username
-                }
+            player1, player2 = (
+                (from_user, username) if from_user < username
+                else (username, from_user)
             )
-            player1, player2 = sorted([from_user, username])
             game_id = f"game-{player1}-{player2}"
             game_engine.create_game(game_id, player1, player2)
-            await self.channel_layer.group_send(
-                    f"user_{self.user.username}",
-                    {
-                        "type": "send.in.game",
-                        "game_id": game_id
-                    }
+            await self.group_send_many([
+                (
+                    f"user_{from_user}",
+                    {"type": "send.invite.accepted", "from": username}
+                ),
+                (
+                    self._user_group,
+                    {"type": "send.in.game", "game_id": game_id}
                 )
+            ])
 
         elif status == "declined":
-            await self.channel_layer.group_send(
-                f"user_{from_user}",
-                {
-                    "type": "send.invite.declined",
-                    "from": username
-                }
-            )
-            await self.channel_layer.group_send(
-                f"user_{username}",
-                {"type": "group.send.invite.state"}
-            )
-            await self.channel_layer.group_send(
-                f"user_{from_user}",
-                {"type": "group.send.invite.state"}
+            await asyncio.gather(
+                self.channel_layer.group_send(
+                    f"user_{from_user}",
+                    {"type": "send.invite.declined", "from": username}
+                ),
+                self.group_send_invite_state_map(states)
             )
 
     @BaseConsumer.refresh_ttl_on_action
@@ -194,16 +234,10 @@ class LobbyConsumer(BaseConsumer):
         if not to_user:
             return
 
-        await InviteService.remove_invite(username, to_user)
+        states = await InviteService.remove_invite(username, to_user)
+        self.stop_invite_watch(username, to_user)
 
-        await self.channel_layer.group_send(
-            f"user_{username}",
-            {"type": "group.send.invite.state"}
-        )
-        await self.channel_layer.group_send(
-            f"user_{to_user}",
-            {"type": "group.send.invite.state"}
-        )
+        await self.group_send_invite_state_map(states)
 
     @BaseConsumer.refresh_ttl_on_action
     async def action_send_msg(self, data):
@@ -211,24 +245,14 @@ class LobbyConsumer(BaseConsumer):
         Sends a message in a 1:1 chat.
         Chat is identified by a consistent ID based on usernames.
         """
-        username = self.user.username
         receiver = data.get("chatWith")
         msg = data.get("msg")
         if not receiver or not msg:
             return
         
-        player1, player2 = sorted([receiver, username])
-        chat_id = f"{player1}_{player2}"
+        chat_id = self._chat_id_for(receiver)
 
-        await RedisService.add_to_set(
-            f"lobby_chats:{username}",
-            chat_id
-        )
-        await RedisService.add_to_set(
-            f"lobby_chats:{data.get('chatWith')}",
-            chat_id
-        )
-        await self.push_message(chat_id, msg)
+        await self.push_message(chat_id, receiver, msg)
         await self.send_chat_notify(receiver)
 
     @BaseConsumer.refresh_ttl_on_action
@@ -240,50 +264,95 @@ class LobbyConsumer(BaseConsumer):
         if not chat_with:
             return
 
-        player1, player2 = sorted([chat_with, self.user.username])
-        chat_id = f"{player1}_{player2}"
+        chat_id = self._chat_id_for(chat_with)
 
+        # Subscribed before reading the history, so no message can land
+        # between the history and the first append.
         await self.channel_layer.group_add(chat_id, self.channel_name)
-        await self.channel_layer.group_send(
-            chat_id,
-            {
-                "type": "send.chat.history",
-                "chat_id": chat_id
-            }
-        )
+        await self.send_chat_history({"chat_id": chat_id})
 
-    @BaseConsumer.refresh_ttl_on_action
     async def action_ping(self, data):
         """
-        Ping from client to keep user's lobby chat history.
+        Ping from client to keep user's lobby chat history
+            and lobby presence.
         """
-        pass
+        await asyncio.gather(
+            self.refresh_user_ttl(),
+            LobbyService.refresh_user(self.user.username)
+        )
+
+    def _chat_id_for(self, other):
+        """
+        Returns the ID of the 1:1 chat between the user and `other`,
+            built once per chat partner and cached for the connection.
+
+        Args:
+            other (str): Username of the chat partner.
+
+        Returns:
+            str: Chat id made of both usernames in sorted order.
+        """
+        chat_id = self._chat_id_cache.get(other)
+        if chat_id is None:
+            username = self.user.username
+            chat_id = (
+                f"{username}_{other}" if username < other
+                else f"{other}_{username}"
+            )
+            self._chat_id_cache[other] = chat_id
+        return chat_id
 
     async def group_send_user_list(self):
         """
         Sends an update to all lobby users with the current user list.
         """
-        await self.channel_layer.group_send(
-            "lobby_users",
-            {"type": "send.user.list"}
-        )
+        await broadcast_user_list(self.channel_layer)
 
     async def send_user_list(self, event):
         """
-        Sends the user list directly to the user.
+        Sends the pre-encoded user list directly to the user.
         """
-        users = await LobbyService.get_users()
-        await self.send_json({
-            "type": "user_list",
-            "users": users,
-            "self": self.user.username
-        })
+        await self.send(text_data=event["payload"])
+
+    async def group_send_invite_states(self, *users):
+        """
+        Reads the invite states of the given users once and sends
+            each user their own state.
+        """
+        states = await InviteService.get_states(users)
+        await self.group_send_invite_state_map(states)
+
+    async def group_send_invite_state_map(self, states):
+        """
+        Sends each user their given invite state, so receivers need
+            no Redis reads.
+
+        Args:
+            states (dict[str, dict]): Usernames mapped to their
+                invite state.
+        """
+        await self.group_send_many([
+            (
+                f"user_{user}",
+                {"type": "group.send.invite.state", "state": state}
+            )
+            for user, state in states.items()
+        ])
 
     async def group_send_invite_state(self, event):
         """
-        Sends the current invite state to the user.
+        Sends the invite state carried by the event to the user,
+            or reads the current one if the event has none.
         """
-        await self.send_invite_state()
+        state = event.get("state")
+        if state is None:
+            await self.send_invite_state()
+            return
+
+        await self.send_json({
+            "type": "invite_state",
+            **state
+        })
 
     async def send_invite_state(self):
         """
@@ -295,29 +364,43 @@ class LobbyConsumer(BaseConsumer):
             **state
         })
 
-    async def schedule_invite_watch(self, user1, user2):
+    async def schedule_invite_watch(self, user1, user2, event):
         """
-        Periodically checks whether an invite has expired.
-        If so, updates both users' invite states.
+        Waits for an invite to expire unless it is answered or cancelled
+            first (signalled through `event`).
+        Once the TTL has passed, updates both users' invite states.
+            The TTL is shared by each user's whole invite set and later
+            invites refresh it, so the states are always resent rather
+            than only when both sets have expired.
         """
-        await asyncio.sleep(60)
-        while True:
-            if await InviteService.invites_expired(user1, user2):
-                await self.channel_layer.group_send(
-                    f"user_{user1}",
-                    {"type": "group.send.invite.state"}
-                )
-                await self.channel_layer.group_send(
-                    f"user_{user2}",
-                    {"type": "group.send.invite.state"}
-                )
-                break
-            await asyncio.sleep(5)
+        try:
+            await asyncio.wait_for(
+                event.wait(),
+                timeout=INVITE_TTL + INVITE_EXPIRY_GRACE
+            )
+            return
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if self._invite_events.get((user1, user2)) is event:
+                del self._invite_events[(user1, user2)]
+
+        await self.group_send_invite_states(user1, user2)
+
+    def stop_invite_watch(self, user1, user2):
+        """
+        Wakes the watcher of an invite sent from `user1` to `user2`,
+            so it returns without waiting for the invite to expire.
+        """
+        event = self._invite_events.pop((user1, user2), None)
+        if event:
+            event.set()
 
     async def send_invite_accepted(self, event):
         """
         Sends a notification to the user that their invite was accepted.
         """
+        self.stop_invite_watch(self.user.username, event["from"])
         await self.send_json({
             "type": "invite_accepted",
             "from": event["from"]
@@ -327,6 +410,7 @@ class LobbyConsumer(BaseConsumer):
         """
         Sends a notification to the user that their invite was declined.
         """
+        self.stop_invite_watch(self.user.username, event["from"])
         await self.send_json({
             "type": "invite_declined",
             "from": event["from"]
@@ -357,29 +441,38 @@ class LobbyConsumer(BaseConsumer):
         """
         Sends a chat history for the specified chat to the user.
         """
-        history = await ChatService.get_history(event["chat_id"])
+        await self.send_chat_history_of(event["chat_id"])
+
+    async def send_chat_append(self, event):
+        """
+        Sends a single new message of the specified chat to the user.
+        """
         await self.send_json({
-            "type": "chat_history",
-            "history": history
+            "type": "chat_append",
+            "chat_id": event["chat_id"],
+            "message": event["message"]
         })
 
-    async def push_message(self, chat_id, msg):
+    async def push_message(self, chat_id, receiver, msg):
         """
-        Stores a new message in the chat and updates the chat group
-            with new history.
+        Stores a new message in the chat, registers the chat for both
+            users and sends the message to the chat group.
         """
-        await ChatService.push_message(
+        message = {
+            "from": self.user.username,
+            "msg": msg
+        }
+        await ChatService.push_lobby_message(
             chat_id,
-            {
-                "from": self.user.username,
-                "msg": msg
-            }
+            (self.user.username, receiver),
+            message
         )
         await self.channel_layer.group_send(
             chat_id,
             {
-                "type": "send.chat.history",
-                "chat_id": chat_id
+                "type": "send.chat.append",
+                "chat_id": chat_id,
+                "message": message
             }
         )
 
@@ -399,9 +492,4 @@ class LobbyConsumer(BaseConsumer):
         Returns:
             string: Game id if game exists, None otherwise.
         """
-        active_game_id = None
-        for game_id, game in game_engine.games.items():
-            if self.user.username in game["players"]:
-                active_game_id = game_id
-                break
-        return active_game_id
\ No newline at end of file
+        return game_engine.find_player_game(self.user.username)
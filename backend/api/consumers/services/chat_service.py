@@ -1,44 +1,78 @@
-import json
+import orjson
+import os
 from .redis_service import RedisService
 
+# Number of most recent messages kept per chat.
+CHAT_HISTORY_MAX = int(os.getenv("CHAT_HISTORY_MAX", 200))
+# Lifetime of an idle chat in seconds, refreshed on every message.
+CHAT_TTL = 86400
+
+# Registers a lobby chat for both players and stores a message in it,
+# keeping only the latest messages.
+# KEYS: lobby_chats:{player1}, lobby_chats:{player2}, chat_id
+# ARGV: chat_id, message, history length, chat TTL
+PUSH_LOBBY_MESSAGE_SCRIPT = """
+redis.call('SADD', KEYS[1], ARGV[1])
+redis.call('SADD', KEYS[2], ARGV[1])
+local length = redis.call('RPUSH', KEYS[3], ARGV[2])
+redis.call('LTRIM', KEYS[3], -tonumber(ARGV[3]), -1)
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+return length
+"""
+
 class ChatService:
     """
     Service for handling chat messages stored in Redis.
-    Provides methods to push messages, retrieve chat history,
-    and delete chat data.
+    Provides methods to push messages and retrieve chat history.
+    Chat data is deleted by the scripts that end games and the
+    lobby chat cleanup.
     """
 
     @staticmethod
     async def push_message(chat_id: str, message: dict):
         """
-        Store a chat message in Redis.
+        Store a chat message in Redis, keeping only the latest
+            `CHAT_HISTORY_MAX` messages.
 
         Args:
             chat_id (str): The unique identifier for the chat.
             message (dict): The message to store, as a dictionary.
         """
-        await RedisService.push_list(chat_id, json.dumps(message))
+        async with RedisService.pipeline() as pipe:
+            pipe.rpush(chat_id, orjson.dumps(message))
+            pipe.ltrim(chat_id, -CHAT_HISTORY_MAX, -1)
+            pipe.expire(chat_id, CHAT_TTL)
+            await pipe.execute()
 
     @staticmethod
-    async def get_history(chat_id):
+    async def push_lobby_message(chat_id: str, players, message: dict):
         """
-        Retrieve full chat history from Redis.
+        Store a lobby chat message and add the chat to both players'
+            chat sets in a single atomic round trip.
 
         Args:
             chat_id (str): The unique identifier for the chat.
-
-        Returns:
-            list[dict]: List of messages as dictionaries.
+            players (tuple[str, str]): Usernames of both chat members.
+            message (dict): The message to store, as a dictionary.
         """
-        history = await RedisService.get_list(chat_id)
-        return [json.loads(m) for m in history]
-    
+        await RedisService.run_script(
+            PUSH_LOBBY_MESSAGE_SCRIPT,
+            keys=[f"lobby_chats:{player}" for player in players] + [chat_id],
+            args=[chat_id, orjson.dumps(message), CHAT_HISTORY_MAX, CHAT_TTL]
+        )
+
     @staticmethod
-    async def delete_chat(chat_id: str):
+    async def get_history(chat_id):
         """
-        Delete all messages for a given chat.
+        Retrieve the latest `CHAT_HISTORY_MAX` messages of a chat
+            from Redis.
+        Messages are returned as stored, already JSON-encoded, so they
+            can be sent on without decoding each one.
 
         Args:
             chat_id (str): The unique identifier for the chat.
+
+        Returns:
+            list[str]: List of JSON-encoded messages.
         """
-        await RedisService.delete(chat_id)
\ No newline at end of file
+        return await RedisService.get_list(chat_id, -CHAT_HISTORY_MAX)
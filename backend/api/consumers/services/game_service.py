@@ -1,6 +1,54 @@
-import json
 from .redis_service import RedisService
 
+# Status flags stored for each player, as `{username}:{flag}` fields
+# of the game's status hash with values "0" or "1".
+STATUS_FLAGS = ("temp_disconnect", "full_disconnect", "restart")
+
+# Marks a player as fully disconnected and, once every player has left,
+# deletes the game's status hash and chat history.
+# KEYS: game status hash, game chat list
+# ARGV: username
+# Returns 1 if the game data was deleted, 0 otherwise.
+LEAVE_GAME_SCRIPT = """
+local field = ARGV[1] .. ':full_disconnect'
+if redis.call('HEXISTS', KEYS[1], field) == 1 then
+    redis.call('HSET', KEYS[1], field, '1')
+end
+local fields = redis.call('HGETALL', KEYS[1])
+for i = 1, #fields, 2 do
+    local flag = string.match(fields[i], ':([^:]*)$')
+    if flag == 'full_disconnect' and fields[i + 1] ~= '1' then
+        return 0
+    end
+end
+redis.call('UNLINK', KEYS[1], KEYS[2])
+return 1
+"""
+
+# Records a player's rematch vote and, if every player has voted, clears
+# all votes in the same atomic step, so exactly one caller sees the quorum.
+# KEYS: game status hash
+# ARGV: username
+# Returns 1 if the vote completed the quorum, 0 otherwise.
+VOTE_RESTART_SCRIPT = """
+redis.call('HSET', KEYS[1], ARGV[1] .. ':restart', '1')
+local fields = redis.call('HGETALL', KEYS[1])
+local votes = {}
+for i = 1, #fields, 2 do
+    local flag = string.match(fields[i], ':([^:]*)$')
+    if flag == 'restart' then
+        if fields[i + 1] ~= '1' then
+            return 0
+        end
+        table.insert(votes, fields[i])
+    end
+end
+for _, field in ipairs(votes) do
+    redis.call('HSET', KEYS[1], field, '0')
+end
+return 1
+"""
+
 class GameService:
     """
     Service for managing player status in a game using Redis.
@@ -8,39 +56,51 @@ class GameService:
     """
 
     @staticmethod
-    async def init_player_status(game_id, username):
+    async def get_player_status(game_id, username):
         """
-        Initialize a player's status in a specific game with default values.
+        Retrieve the status of a specific player in a game.
 
         Args:
             game_id (str): The unique identifier for the game.
             username (str): The player's username.
 
         Returns:
-            dict: The initialized status dictionary.
+            dict | None: The player's status dictionary, or None if not found.
         """
-        status = {
-            "temp_disconnect": False,
-            "full_disconnect": False,
-            "restart": False
+        values = await RedisService.get_hash_many(
+            game_id,
+            [f"{username}:{flag}" for flag in STATUS_FLAGS]
+        )
+        if all(value is None for value in values):
+            return None
+        return {
+            flag: value == "1"
+            for flag, value in zip(STATUS_FLAGS, values)
         }
-        await RedisService.set_hash(game_id, username, json.dumps(status))
-        return status
 
     @staticmethod
-    async def get_player_status(game_id, username):
+    async def get_or_init_player_status(game_id, username):
         """
-        Retrieve the status of a specific player in a game.
+        Retrieve a player's status, initializing any missing flag with
+            its default value first, in a single round trip.
 
         Args:
             game_id (str): The unique identifier for the game.
             username (str): The player's username.
 
         Returns:
-            dict | None: The player's status dictionary, or None if not found.
+            dict: The player's status dictionary.
         """
-        data = await RedisService.get_hash(game_id, username)
-        return json.loads(data) if data else None
+        fields = [f"{username}:{flag}" for flag in STATUS_FLAGS]
+        async with RedisService.pipeline() as pipe:
+            for field in fields:
+                pipe.hsetnx(game_id, field, 0)
+            pipe.hmget(game_id, fields)
+            *_, values = await pipe.execute()
+        return {
+            flag: value == "1"
+            for flag, value in zip(STATUS_FLAGS, values)
+        }
 
     @staticmethod
     async def set_status(game_id, username, key, value):
@@ -53,32 +113,69 @@ class GameService:
             key (str): The status key to update (e.g., "restart").
             value (bool): The new value for the status key.
         """
-        status = await GameService.get_player_status(game_id, username)
-        status[key] = value
-        await RedisService.set_hash(game_id, username, json.dumps(status))
+        await RedisService.set_hash(game_id, f"{username}:{key}", int(value))
 
     @staticmethod
-    async def all_status_true(game_id, key):
+    async def get_flags(game_id, players, flags):
         """
-        Check if a given status key is True for all players in a game.
+        Read selected status flags of several players in one command.
 
         Args:
             game_id (str): The unique identifier for the game.
-            key (str): The status key to check.
+            players (Iterable[str]): The players' usernames.
+            flags (Iterable[str]): The status keys to read.
 
         Returns:
-            bool: True if all players have the status key set to True,
-                False otherwise.
+            dict[str, dict]: Each player mapped to their requested flags;
+                flags that are not stored read as False.
         """
-        players = await RedisService.get_all_hash(game_id)
-        return all(json.loads(v)[key] for v in players.values())
+        fields = [(player, flag) for player in players for flag in flags]
+        values = await RedisService.get_hash_many(
+            game_id,
+            [f"{player}:{flag}" for player, flag in fields]
+        )
+        statuses = {}
+        for (player, flag), value in zip(fields, values):
+            statuses.setdefault(player, {})[flag] = value == "1"
+        return statuses
 
     @staticmethod
-    async def delete_game_status(game_id):
+    async def vote_restart(game_id, username):
         """
-        Delete all status data for a game.
+        Record a player's rematch vote and check for quorum in a single
+            atomic step. Once all players have voted, the votes are
+            cleared for the next rematch.
 
         Args:
             game_id (str): The unique identifier for the game.
+            username (str): The voting player's username.
+
+        Returns:
+            bool: True if this vote completed the quorum, False otherwise.
+        """
+        return bool(await RedisService.run_script(
+            VOTE_RESTART_SCRIPT,
+            keys=[game_id],
+            args=[username]
+        ))
+
+    @staticmethod
+    async def leave_game(game_id, username, chat_id):
+        """
+        Mark a player as fully disconnected and, if all players have
+            left, delete the game status and chat in the same atomic step.
+
+        Args:
+            game_id (str): The unique identifier for the game.
+            username (str): The leaving player's username.
+            chat_id (str): The identifier of the game's chat.
+
+        Returns:
+            bool: True if all players have left and the game data
+                was deleted, False otherwise.
         """
-        await RedisService.delete(game_id)
\ No newline at end of file
+        return bool(await RedisService.run_script(
+            LEAVE_GAME_SCRIPT,
+            keys=[game_id, chat_id],
+            args=[username]
+        ))
@@ -1,5 +1,8 @@
 from .redis_service import RedisService
 
+# Lifetime of a pending invite in seconds.
+INVITE_TTL = 60
+
 class InviteService:
     """
     Service for managing game invites using Redis.
@@ -10,37 +13,51 @@ class InviteService:
     async def add_invite(from_user, to_user):
         """
         Add a new game invite to Redis with expiration.
+        The resulting invite states of both users are read back
+            in the same round trip.
 
         Args:
             from_user (str): Username of the sender.
             to_user (str): Username of the recipient.
+
+        Returns:
+            dict[str, dict]: Both usernames mapped to their invite state,
+                as returned by `get_states`.
         """
-        await RedisService.add_to_set(
-            f"invites_incoming:{to_user}",
-            from_user, ex=60
-        )
-        await RedisService.add_to_set(
-            f"invites_outgoing:{from_user}",
-            to_user, ex=60
-        )
+        incoming_key = f"invites_incoming:{to_user}"
+        outgoing_key = f"invites_outgoing:{from_user}"
+        users = (from_user, to_user)
+        async with RedisService.pipeline() as pipe:
+            pipe.sadd(incoming_key, from_user)
+            pipe.expire(incoming_key, INVITE_TTL)
+            pipe.sadd(outgoing_key, to_user)
+            pipe.expire(outgoing_key, INVITE_TTL)
+            InviteService._queue_states(pipe, users)
+            results = await pipe.execute()
+        return InviteService._collect_states(users, results[4:])
 
     @staticmethod
     async def remove_invite(from_user, to_user):
         """
         Remove an existing game invite from Redis.
+        The resulting invite states of both users are read back
+            in the same round trip.
 
         Args:
             from_user (str): Username of the sender.
             to_user (str): Username of the recipient.
+
+        Returns:
+            dict[str, dict]: Both usernames mapped to their invite state,
+                as returned by `get_states`.
         """
-        await RedisService.remove_from_set(
-            f"invites_incoming:{to_user}",
-            from_user
-        )
-        await RedisService.remove_from_set(
-            f"invites_outgoing:{from_user}",
-            to_user
-        )
+        users = (from_user, to_user)
+        async with RedisService.pipeline() as pipe:
+            pipe.srem(f"invites_incoming:{to_user}", from_user)
+            pipe.srem(f"invites_outgoing:{from_user}", to_user)
+            InviteService._queue_states(pipe, users)
+            results = await pipe.execute()
+        return InviteService._collect_states(users, results[2:])
 
     @staticmethod
     async def get_state(username):
@@ -54,30 +71,49 @@ class InviteService:
             dict: A dictionary with keys 'incoming' and 'outgoing',
                 each containing a list of usernames.
         """
-        incoming = await RedisService.get_set(
-            f"invites_incoming:{username}"
-        )
-        outgoing = await RedisService.get_set(
-            f"invites_outgoing:{username}"
-        )
-        return {"incoming": incoming, "outgoing": outgoing}
+        async with RedisService.pipeline() as pipe:
+            pipe.smembers(f"invites_incoming:{username}")
+            pipe.smembers(f"invites_outgoing:{username}")
+            incoming, outgoing = await pipe.execute()
+        return {"incoming": list(incoming), "outgoing": list(outgoing)}
 
     @staticmethod
-    async def invites_expired(user1, user2):
+    async def get_states(usernames):
         """
-        Check if invites between two users have expired.
+        Retrieve the current invites for several users at once.
 
         Args:
-            user1 (str): The first username.
-            user2 (str): The second username.
+            usernames (Iterable[str]): The usernames to check invites for.
 
         Returns:
-            bool: True if both invites no longer exist in Redis.
+            dict[str, dict]: Each username mapped to a dictionary with keys
+                'incoming' and 'outgoing', as returned by `get_state`.
+        """
+        usernames = list(usernames)
+        async with RedisService.pipeline() as pipe:
+            InviteService._queue_states(pipe, usernames)
+            results = await pipe.execute()
+        return InviteService._collect_states(usernames, results)
+
+    @staticmethod
+    def _queue_states(pipe, usernames):
+        """
+        Queue the reads of the users' incoming and outgoing invites
+            on a pipeline.
+        """
+        for username in usernames:
+            pipe.smembers(f"invites_incoming:{username}")
+            pipe.smembers(f"invites_outgoing:{username}")
+
+    @staticmethod
+    def _collect_states(usernames, results):
+        """
+        Build the invite states from the results of `_queue_states`.
         """
-        exists_incoming = await RedisService.exists(
-            f"invites_incoming:{user2}"
-        )
-        exists_outgoing = await RedisService.exists(
-            f"invites_outgoing:{user1}"
-        )
-        return not exists_incoming and not exists_outgoing
\ No newline at end of file
+        return {
+            username: {
+                "incoming": list(results[2 * i]),
+                "outgoing": list(results[2 * i + 1])
+            }
+            for i, username in enumerate(usernames)
+        }
@@ -1,5 +1,11 @@
+import time
 from .redis_service import RedisService
 
+# Sorted set of lobby users, scored by the time they were last seen.
+LOBBY_PRESENCE_KEY = "lobby_presence"
+# Seconds after which a user who was not seen is no longer listed.
+LOBBY_PRESENCE_TTL = 120
+
 class LobbyService:
     """
     Service for managing users in the game lobby using Redis.
@@ -9,22 +15,39 @@ class LobbyService:
     @staticmethod
     async def add_user(username):
         """
-        Add a user to the lobby set in Redis.
+        Add a user to the lobby presence set in Redis.
 
         Args:
             username (str): The username to add.
         """
-        await RedisService.add_to_set("lobby_users", username)
+        await RedisService.add_to_sorted_set(
+            LOBBY_PRESENCE_KEY,
+            {username: time.time()}
+        )
+
+    @staticmethod
+    async def refresh_user(username):
+        """
+        Mark a user already in the lobby as seen now.
+
+        Args:
+            username (str): The username to refresh.
+        """
+        await RedisService.add_to_sorted_set(
+            LOBBY_PRESENCE_KEY,
+            {username: time.time()},
+            xx=True
+        )
 
     @staticmethod
     async def remove_user(username):
         """
-        Remove a user from the lobby set in Redis.
+        Remove a user from the lobby presence set in Redis.
 
         Args:
             username (str): The username to remove.
         """
-        await RedisService.remove_from_set("lobby_users", username)
+        await RedisService.remove_from_sorted_set(LOBBY_PRESENCE_KEY, username)
 
     @staticmethod
     async def get_users():
@@ -34,4 +57,23 @@ class LobbyService:
         Returns:
             list[str]: A list of usernames in the lobby.
         """
-        return await RedisService.get_set("lobby_users")
\ No newline at end of file
+        return await RedisService.get_sorted_set_by_score(
+            LOBBY_PRESENCE_KEY,
+            f"({time.time() - LOBBY_PRESENCE_TTL}",
+            "+inf"
+        )
+
+    @staticmethod
+    async def remove_stale_users():
+        """
+        Remove users who have not been seen within the presence TTL,
+            e.g. after a server crash skipped their disconnect.
+
+        Returns:
+            int: Number of removed users.
+        """
+        return await RedisService.remove_sorted_set_by_score(
+            LOBBY_PRESENCE_KEY,
+            0,
+            time.time() - LOBBY_PRESENCE_TTL
+        )
@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 
 load_dotenv()
 REDIS_URL = os.getenv("REDIS_URL")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 32))
 
 class RedisService:
     """
@@ -11,26 +12,62 @@ class RedisService:
     Implements a singleton pattern to reuse Redis connection.
 
     Attributes:
-        redis (redis.Redis | None): Cached Redis connection instance.
+        redis (redis.Redis | None): Shared Redis client, created by
+            `init` at application startup.
+        scripts (dict[str, AsyncScript]): Registered Lua scripts,
+            keyed by their source.
     """
 
     redis = None
+    scripts = {}
 
     @classmethod
-    async def get_redis(cls):
+    def init(cls):
+        """
+        Create the shared Redis client.
+        Called once at application startup; the client connects lazily
+            on its first command, so no I/O happens here.
+        Concurrent commands use separate pooled connections, up to
+            `REDIS_MAX_CONNECTIONS`; beyond that they wait for a free one.
+        """
+        pool = redis.BlockingConnectionPool.from_url(
+            REDIS_URL,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            encoding="utf-8",
+            decode_responses=True
+        )
+        cls.redis = redis.Redis(connection_pool=pool)
+
+    @classmethod
+    def pipeline(cls):
         """
-        Initialize or return the cached Redis connection.
+        Create a non-transactional pipeline for batching commands.
+        Queued commands are sent together and answered in a single
+            round trip when the pipeline is executed.
 
         Returns:
-            redis.Redis: Async Redis connection instance.
+            redis.client.Pipeline: Async Redis pipeline instance.
         """
-        if not cls.redis:
-            cls.redis = await redis.from_url(
-                REDIS_URL,
-                encoding="utf-8",
-                decode_responses=True
-            )
-        return cls.redis
+        return cls.redis.pipeline(transaction=False)
+
+    @classmethod
+    async def run_script(cls, script, keys, args):
+        """
+        Run a Lua script atomically on the Redis server.
+        Each script is registered once and then invoked by its SHA1
+            digest (EVALSHA), reloading it only if Redis lost it.
+
+        Args:
+            script (str): Lua source of the script.
+            keys (list[str]): Redis keys passed as KEYS.
+            args (list): Arguments passed as ARGV.
+
+        Returns:
+            Any: The script's return value.
+        """
+        if script not in cls.scripts:
+            cls.scripts[script] = cls.redis.register_script(script)
+        return await cls.scripts[script](keys=keys, args=args)
 
     @classmethod
     async def set_with_ttl(cls, key, ex=30):
@@ -41,102 +78,98 @@ class RedisService:
             key (str): Redis key to set.
             ex (int, optional): Expiration time in seconds. Defaults to 30.
         """
-        conn = await cls.get_redis()
+        conn = cls.redis
         await conn.set(key, 1, ex=ex)
 
     @classmethod
-    async def add_to_set(cls, key, value, ex=None):
+    async def add_to_sorted_set(cls, key, mapping, xx=False):
         """
-        Add a value to a Redis set and optionally set expiration time.
+        Add members to a Redis sorted set or update their scores.
 
         Args:
-            key (str): Redis set key.
-            value (str): Value to add to the set.
-            ex (int | None, optional): Expiration time in seconds.
-                Defaults to None.
+            key (str): Redis sorted set key.
+            mapping (dict[str, float]): Members mapped to their scores.
+            xx (bool, optional): Only update members that already exist.
+                Defaults to False.
         """
-        conn = await cls.get_redis()
-        await conn.sadd(key, value)
-        if ex:
-            await conn.expire(key, ex)
+        conn = cls.redis
+        await conn.zadd(key, mapping, xx=xx)
 
     @classmethod
-    async def remove_from_set(cls, key, value):
+    async def remove_from_sorted_set(cls, key, value):
         """
-        Remove a value from a Redis set.
+        Remove a member from a Redis sorted set.
 
         Args:
-            key (str): Redis set key.
-            value (str): Value to remove from the set.
+            key (str): Redis sorted set key.
+            value (str): Member to remove.
         """
-        conn = await cls.get_redis()
-        await conn.srem(key, value)
+        conn = cls.redis
+        await conn.zrem(key, value)
 
     @classmethod
-    async def get_set(cls, key):
+    async def get_sorted_set_by_score(cls, key, min_score, max_score):
         """
-        Retrieve all members of a Redis set as a list.
+        Retrieve the members of a Redis sorted set within a score range.
 
         Args:
-            key (str): Redis set key.
+            key (str): Redis sorted set key.
+            min_score (float | str): Lowest score, "(" prefix for exclusive.
+            max_score (float | str): Highest score, "+inf" for no limit.
 
         Returns:
-            list[str]: List of set members.
+            list[str]: Members ordered by score.
         """
-
-        conn = await cls.get_redis()
-        return list(await conn.smembers(key))
+        conn = cls.redis
+        return await conn.zrangebyscore(key, min_score, max_score)
 
     @classmethod
-    async def push_list(cls, key, value):
+    async def remove_sorted_set_by_score(cls, key, min_score, max_score):
         """
-        Append a value to the end of a Redis list.
+        Remove the members of a Redis sorted set within a score range.
 
         Args:
-            key (str): Redis list key.
-            value (str): Value to append.
+            key (str): Redis sorted set key.
+            min_score (float | str): Lowest score.
+            max_score (float | str): Highest score.
+
+        Returns:
+            int: Number of removed members.
         """
-        conn = await cls.get_redis()
-        await conn.rpush(key, value)
+        conn = cls.redis
+        return await conn.zremrangebyscore(key, min_score, max_score)
 
     @classmethod
-    async def get_list(cls, key):
+    async def get_list(cls, key, start=0, end=-1):
         """
-        Retrieve all elements from a Redis list.
+        Retrieve a range of elements from a Redis list.
 
         Args:
             key (str): Redis list key.
+            start (int, optional): Index of the first element.
+                Defaults to 0.
+            end (int, optional): Index of the last element, inclusive.
+                Defaults to -1 (the last element).
 
         Returns:
             list[str]: List elements.
         """
-        conn = await cls.get_redis()
-        return await conn.lrange(key, 0, -1)
-
-    @classmethod
-    async def delete(cls, key):
-        """
-        Delete a key from Redis.
-
-        Args:
-            key (str): Redis key to delete.
-        """
-        conn = await cls.get_redis()
-        await conn.delete(key)
+        conn = cls.redis
+        return await conn.lrange(key, start, end)
 
     @classmethod
-    async def exists(cls, key):
+    async def get_many(cls, keys):
         """
-        Check if a Redis key exists.
+        Get the values of several keys with a single MGET.
 
         Args:
-            key (str): Redis key to check.
+            keys (list[str]): Redis keys to read.
 
         Returns:
-            int: 1 if exists, 0 otherwise.
+            list: Values in the order of `keys`, None for missing keys.
         """
-        conn = await cls.get_redis()
-        return await conn.exists(key)
+        conn = cls.redis
+        return await conn.mget(keys)
 
     @classmethod
     async def set_hash(cls, name, key, value):
@@ -148,49 +181,24 @@ class RedisService:
             key (str): Field name in the hash.
             value (str): Value to set.
         """
-        conn = await cls.get_redis()
+        conn = cls.redis
         await conn.hset(name, key, value)
 
     @classmethod
-    async def get_hash(cls, name, key):
+    async def get_hash_many(cls, name, keys):
         """
-        Get a field value from a Redis hash.
-        
-        Args:
-            name (str): Redis hash key.
-            key (str): Field name.
+        Get several field values from a Redis hash in one command.
 
-        Returns:
-            str | None: Value of the field or None if not found.
-        """
-        conn = await cls.get_redis()
-        return await conn.hget(name, key)
-
-    @classmethod
-    async def get_all_hash(cls, name):
-        """
-        Retrieve all fields and values from a Redis hash.
-        
         Args:
             name (str): Redis hash key.
+            keys (list[str]): Field names.
 
         Returns:
-            dict[str, str]: All key-value pairs in the hash.
-        """
-        conn = await cls.get_redis()
-        return await conn.hgetall(name)
-
-    @classmethod
-    async def delete_from_hash(cls, name, key):
-        """
-        Delete a field from a Redis hash.
-
-        Args:
-            name (str): Redis hash key.
-            key (str): Field to delete.
+            list[str | None]: Values of the fields in the given order,
+                None for missing fields.
         """
-        conn = await cls.get_redis()
-        await conn.hdel(name, key)
+        conn = cls.redis
+        return await conn.hmget(name, keys)
 
     @classmethod
     async def incr_user_connections(cls, page, user_id):
@@ -200,7 +208,7 @@ class RedisService:
         Args:
             user_id (str): User identifier.
         """
-        conn = await cls.get_redis()
+        conn = cls.redis
         key = f"{page}:{user_id}:connections"
         await conn.incr(key)
 
@@ -215,10 +223,10 @@ class RedisService:
         Returns:
             int: Remaining number of active connections.
         """
-        conn = await cls.get_redis()
+        conn = cls.redis
         key = f"{page}:{user_id}:connections"
         count = await conn.decr(key)
         if count < 0:
             await conn.set(key, 0)
             count = 0
-        return int(count)
\ No newline at end of file
+        return int(count)
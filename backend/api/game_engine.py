@@ -7,7 +7,7 @@ def create_empty_board():
     Returns:
         list[list[str]]: A 10x10 grid initialized with empty strings.
     """
-    return [["" for _ in range(10)] for _ in range(10)]
+    return [[""] * 10 for _ in range(10)]
 
 
 class GameEngine:
@@ -18,9 +18,11 @@ class GameEngine:
 
     def __init__(self):
         """
-        Initialize the GameEngine with an empty game dictionary.
+        Initialize the GameEngine with an empty game dictionary
+            and an index of each player's current game.
         """
         self.games = {}
+        self.player_to_game = {}
 
     def create_game(self, game_id, player1, player2):
         """
@@ -33,6 +35,10 @@ class GameEngine:
         """
         self.games[game_id] = {
             "players": [player1, player2],
+            "opponent": {
+                player1: player2,
+                player2: player1
+            },
             "boards": {
                 player1: create_empty_board(),
                 player2: create_empty_board()
@@ -49,13 +55,30 @@ class GameEngine:
                 player1: [],
                 player2: []
             },
+            # Maps each occupied (x, y) cell to the ship covering it.
+            "ship_cells": {
+                player1: {},
+                player2: {}
+            },
+            # Number of ships still to be placed, the sum of ships_left.
+            "ships_to_place": {
+                player1: 5,
+                player2: 5
+            },
+            # Number of placed ships that are not sunk yet.
+            "ships_afloat": {
+                player1: 0,
+                player2: 0
+            },
             "ready": {
                 player1: False,
                 player2: False
             },
-            "turn": random.choice([player1, player2]),
+            "turn": player1 if random.getrandbits(1) else player2,
             "winner": None
         }
+        self.player_to_game[player1] = game_id
+        self.player_to_game[player2] = game_id
 
     def get_game(self, game_id):
         """
@@ -65,9 +88,10 @@ class GameEngine:
             game_id (str): Unique game identifier.
 
         Returns:
-            dict: The game state dictionary.
+            dict | None: The game state dictionary, or None if the game
+                does not exist.
         """
-        return self.games[game_id]
+        return self.games.get(game_id)
     
     def place_ships(
             self,
@@ -104,29 +128,32 @@ class GameEngine:
             return {"result": f"NO MORE SHIPS OF LENGTH {length} AVAILABLE",
                     "access": "private"}
 
-        coords = []
-
-        for i in range(length):
-            x = x_start + i if orientation == "horizontal" else x_start
-            y = y_start if orientation == "horizontal" else y_start + i
-            if not(0 <= x < 10 and 0 <= y < 10):
-                return {"result": f"SHIP OUT OF BOUNDS",
-                        "access": "private"}
-
-            if board[y][x] == "S":
-                return {"result": f"SHIP OVERLAPS WITH ANOTHER",
-                        "access": "private"}
+        dx, dy = (1, 0) if orientation == "horizontal" else (0, 1)
+        x_end = x_start + (length - 1) * dx
+        y_end = y_start + (length - 1) * dy
+        if not (0 <= x_start and x_end < 10 and 0 <= y_start and y_end < 10):
+            return {"result": f"SHIP OUT OF BOUNDS",
+                    "access": "private"}
 
-            coords.append((x, y))
+        coords = [(x_start + i * dx, y_start + i * dy) for i in range(length)]
+        ship_cells = game["ship_cells"][player]
+        if any(cell in ship_cells for cell in coords):
+            return {"result": f"SHIP OVERLAPS WITH ANOTHER",
+                    "access": "private"}
 
+        ship = {
+            "coords": coords,
+            "hits": 0,
+            "sunk": False
+        }
         for x, y in coords:
             board[y][x] = "S"
+            ship_cells[(x, y)] = ship
 
-        game["placed_ships"][player].append({
-            "coords": coords,
-            "sunk": False
-        })
+        game["placed_ships"][player].append(ship)
         game["ships_left"][player][length] -= 1
+        game["ships_to_place"][player] -= 1
+        game["ships_afloat"][player] += 1
 
         return {"result": "SHIP PLACED",
                 "access": "private"}
@@ -152,18 +179,18 @@ class GameEngine:
         board = game["boards"][player]
         ships = game["placed_ships"][player]
         ships_left = game["ships_left"][player]
+        ship_cells = game["ship_cells"][player]
 
-        ship_to_remove = None
-        for ship in ships:
-            if (x, y) in ship["coords"]:
-                ship_to_remove = ship
-                break
+        ship_to_remove = ship_cells.get((x, y))
 
         if ship_to_remove:
             for sx, sy in ship_to_remove["coords"]:
                 board[sy][sx] = ""
+                del ship_cells[(sx, sy)]
             ships.remove(ship_to_remove)
             ships_left[len(ship_to_remove["coords"])] += 1
+            game["ships_to_place"][player] += 1
+            game["ships_afloat"][player] -= 1
             return {"result": "SHIP REMOVED",
                     "access": "private"}
         else:
@@ -187,7 +214,7 @@ class GameEngine:
             return {"result": "GAME NOT FOUND",
                     "access": "private"}
 
-        if any(count > 0 for count in game["ships_left"][player].values()):
+        if game["ships_to_place"][player] > 0:
             return {"result": "YOU MUST PLACE ALL SHIPS FIRST",
                     "access": "private"}
 
@@ -208,6 +235,9 @@ class GameEngine:
 
         Returns:
             dict: Move result, including whether it was a hit, miss, or win.
+                Accepted moves also carry the new cell `value`, the
+                coordinates of a ship they `sunk` (or None) and the
+                `winner`.
         """
         game = self.get_game(game_id)
 
@@ -219,32 +249,31 @@ class GameEngine:
             return {"result": "NOT YOUR TURN",
                     "access": "private"}
 
-        enemy = [p for p in game["players"] if p != player][0]
-        enemy_board = game["boards"][enemy]
+        enemy = game["opponent"][player]
         hit_board = game["hits"][player]
 
         if hit_board[y][x] != "":
             return {"result": "ALREADY SHOT THIS POSITION",
                     "access": "private"}
 
-        if enemy_board[y][x] == "S":
+        sunk = None
+        ship = game["ship_cells"][enemy].get((x, y))
+        if ship:
             hit_board[y][x] = "X"
             result = f"{str(player).upper()} LANDED A HIT"
 
-            for ship in game["placed_ships"][enemy]:
-                if (x, y) in ship["coords"]:
-                    if all(
-                        hit_board[yy][xx] == "X" for xx, yy in ship["coords"]
-                    ):
-                        result = f"{str(player).upper()} SUNK ENEMY SHIP"
-                        ship["sunk"] = True
-                        
-                        if all(
-                            s["sunk"] for s in game["placed_ships"][enemy]
-                        ):
-                            result = f"GAME OVER! {str(player).upper()} WON!"
-                            game["winner"] = player
-                    break
+            # Cells are only shot once, so a ship is sunk as soon as
+            # its hit count reaches its length.
+            ship["hits"] += 1
+            if ship["hits"] == len(ship["coords"]):
+                result = f"{str(player).upper()} SUNK ENEMY SHIP"
+                ship["sunk"] = True
+                sunk = ship["coords"]
+                game["ships_afloat"][enemy] -= 1
+
+                if game["ships_afloat"][enemy] == 0:
+                    result = f"GAME OVER! {str(player).upper()} WON!"
+                    game["winner"] = player
         else:
             hit_board[y][x] = "O"
             result = f"{str(player).upper()} MISSED"
@@ -256,7 +285,10 @@ class GameEngine:
             "access": "public",
             "x": x,
             "y": y,
-            "next_turn": game["turn"]
+            "value": hit_board[y][x],
+            "sunk": sunk,
+            "next_turn": game["turn"],
+            "winner": game["winner"]
         }
     
     def get_game_state(self, game_id, player):
@@ -271,26 +303,42 @@ class GameEngine:
             dict: Game state including boards, hits, turn, and winner.
         """
         game = self.get_game(game_id)
-        enemy = [p for p in game["players"] if p != player][0]
-
         if not game:
             return None
+
+        enemy = game["opponent"][player]
+        boards = game["boards"]
+        hits = game["hits"]
+        placed_ships = game["placed_ships"]
+        ready = game["ready"]
         return {
             "players": game["players"],
             "self": player,
-            "own_board": game["boards"][player],
-            "opponent_board": game["boards"][enemy],
-            "hits": game["hits"][player],
-            "opponent_hits": game["hits"][enemy],
-            "placed_ships": game["placed_ships"][player],
-            "opponent_placed_ships": game["placed_ships"][enemy],
+            "own_board": boards[player],
+            "opponent_board": boards[enemy],
+            "hits": hits[player],
+            "opponent_hits": hits[enemy],
+            "placed_ships": placed_ships[player],
+            "opponent_placed_ships": placed_ships[enemy],
             "ships_left": game["ships_left"][player],
-            "ready": game["ready"][player],
-            "opponent_ready": game["ready"][enemy],
+            "ready": ready[player],
+            "opponent_ready": ready[enemy],
             "turn": game["turn"],
             "winner": game["winner"]
         }
     
+    def find_player_game(self, player):
+        """
+        Find the game a player currently belongs to.
+
+        Args:
+            player (str): Player username.
+
+        Returns:
+            str | None: Game identifier, or None if the player has no game.
+        """
+        return self.player_to_game.get(player)
+
     def end_game(self, game_id):
         """
         Delete the game and its data by ID.
@@ -298,8 +346,12 @@ class GameEngine:
         Args:
             game_id (str): Game identifier.
         """
-        if game_id in self.games:
-            del self.games[game_id]
+        game = self.games.pop(game_id, None)
+        if not game:
+            return
+        for player in game["players"]:
+            if self.player_to_game.get(player) == game_id:
+                del self.player_to_game[player]
 
 # Global instance of the game engine
 game_engine = GameEngine()
\ No newline at end of file
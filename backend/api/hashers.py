@@ -0,0 +1,11 @@
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+class LoginPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 hasher with the OWASP recommended iteration count.
+    Django's default of 1,000,000 iterations dominates the cost of
+        every login; hashes stored with it are still verified and
+        rehashed with this count on the next successful login.
+    """
+
+    iterations = 600_000
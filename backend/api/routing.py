@@ -1,4 +1,4 @@
-from django.urls import re_path
+from django.urls import path, re_path
 from .consumers import lobby_consumer, game_consumer
 
 # WebSocket URL patterns
@@ -7,7 +7,7 @@ from .consumers import lobby_consumer, game_consumer
 websocket_urlpatterns = [
     # Lobby WebSocket endpoint:
     # Handles connections for the game lobby (user list, invites, chat).
-    re_path("ws/lobby/", lobby_consumer.LobbyConsumer.as_asgi()),
+    path("ws/lobby/", lobby_consumer.LobbyConsumer.as_asgi()),
 
     # Game WebSocket endpoint:
     # Handles connections for a specific game identified by `game_id`.
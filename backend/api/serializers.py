@@ -1,4 +1,6 @@
 from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 
 class UserSerializer(serializers.ModelSerializer):
@@ -13,7 +15,12 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "password"]
-        extra_kwargs = {"password": {"write_only": True}}
+        # Uniqueness is enforced by the database index on insert,
+        # so the field skips the UniqueValidator lookup.
+        extra_kwargs = {
+            "username": {"validators": [UnicodeUsernameValidator()]},
+            "password": {"write_only": True}
+        }
 
     def create(self, validated_data):
         """
@@ -23,29 +30,33 @@ class UserSerializer(serializers.ModelSerializer):
             validated_data (dict): Validated user data containing
                 username and password.
 
+        Raises:
+            serializers.ValidationError: If the username already exists.
+
         Returns:
             User: Created user instance.
         """
-        user = User.objects.create(**validated_data)
-        user.set_password(user.password)
-        user.save()
-        return user
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(**validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"username": ["Username is already taken."]}
+            )
     
     def validate_username(self, value):
         """
-        Validate that the username is unique.
+        Validate the username length.
 
         Args:
             value (str): The username to validate.
 
         Raises:
-            serializers.ValidationError: If the username already exists.
+            serializers.ValidationError: If the username is too long.
 
         Returns:
             str: The validated username.
         """
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("Username is already taken.")
         if len(value) > 12:
             raise serializers.ValidationError(
                 "Username must be at most 12 characters long."
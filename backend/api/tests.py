@@ -1,3 +1,233 @@
-from django.test import TestCase
+from unittest import mock
+import fakeredis
+import orjson
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .consumers.services.chat_service import ChatService
+from .consumers.services.game_service import GameService
+from .consumers.services.redis_service import RedisService
+from .game_engine import GameEngine
 
-# Create your tests here.
+# Login throttle counters are kept in memory instead of in Redis.
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+# One ship of each length of the fleet {2: 1, 3: 2, 4: 1, 5: 1},
+# placed horizontally in separate rows.
+FLEET = [(0, 0, 2), (0, 2, 3), (0, 4, 3), (0, 6, 4), (0, 8, 5)]
+
+
+class RedisTestCase(SimpleTestCase):
+    """
+    Base class for tests of the Redis services.
+    Each test gets its own in-memory Redis server, and Lua scripts
+        run through lupa, so no Redis server is needed.
+    """
+
+    def setUp(self):
+        self.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        patcher = mock.patch.multiple(
+            RedisService,
+            redis=self.redis,
+            scripts={}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class ChatServiceTests(RedisTestCase):
+    """
+    Tests of the chat storage scripts.
+    """
+
+    async def test_lobby_message_registers_chat_for_both_players(self):
+        chat_id = "alice_bob"
+        message = {"from": "alice", "msg": "hi"}
+
+        await ChatService.push_lobby_message(
+            chat_id,
+            ("alice", "bob"),
+            message
+        )
+
+        for player in ("alice", "bob"):
+            self.assertEqual(
+                await self.redis.smembers(f"lobby_chats:{player}"),
+                {chat_id}
+            )
+        history = await ChatService.get_history(chat_id)
+        self.assertEqual([orjson.loads(m) for m in history], [message])
+
+
+class GameServiceTests(RedisTestCase):
+    """
+    Tests of the player status scripts.
+    """
+
+    async def test_last_player_leaving_deletes_game_data(self):
+        for player in ("alice", "bob"):
+            await GameService.get_or_init_player_status("game", player)
+        await ChatService.push_message("chat", {"from": "system", "msg": "hi"})
+
+        self.assertFalse(await GameService.leave_game("game", "alice", "chat"))
+        status = await GameService.get_player_status("game", "alice")
+        self.assertTrue(status["full_disconnect"])
+        self.assertEqual(len(await ChatService.get_history("chat")), 1)
+
+        self.assertTrue(await GameService.leave_game("game", "bob", "chat"))
+        self.assertEqual(await self.redis.exists("game", "chat"), 0)
+
+    async def test_vote_restart_needs_every_player(self):
+        for player in ("alice", "bob"):
+            await GameService.get_or_init_player_status("game", player)
+
+        self.assertFalse(await GameService.vote_restart("game", "alice"))
+        status = await GameService.get_player_status("game", "alice")
+        self.assertTrue(status["restart"])
+
+        self.assertTrue(await GameService.vote_restart("game", "bob"))
+        for player in ("alice", "bob"):
+            status = await GameService.get_player_status("game", player)
+            self.assertFalse(status["restart"])
+
+        # The votes were cleared, so the next rematch needs both again.
+        self.assertFalse(await GameService.vote_restart("game", "bob"))
+
+
+class GameEngineTests(SimpleTestCase):
+    """
+    Tests of ship placement and shot resolution in the game engine.
+    """
+
+    def setUp(self):
+        self.engine = GameEngine()
+        self.engine.create_game("game", "alice", "bob")
+        self.game = self.engine.get_game("game")
+
+    def place_fleet(self, player):
+        """
+        Place the whole fleet for the player.
+        """
+        for x, y, length in FLEET:
+            result = self.engine.place_ships(
+                "game", player, x, y, length, "horizontal"
+            )
+            self.assertEqual(result["result"], "SHIP PLACED")
+
+    def shoot(self, player, x, y):
+        """
+        Fire at (x, y) as the player, regardless of whose turn it is.
+        """
+        self.game["turn"] = player
+        return self.engine.make_move("game", player, x, y)
+
+    def test_set_ready_requires_all_ships(self):
+        self.engine.place_ships("game", "alice", 0, 0, 2, "horizontal")
+        result = self.engine.set_ready("game", "alice")
+
+        self.assertEqual(result["result"], "YOU MUST PLACE ALL SHIPS FIRST")
+        self.assertFalse(self.game["ready"]["alice"])
+
+    def test_remove_ship_restores_counters(self):
+        self.place_fleet("alice")
+        self.engine.remove_ship("game", "alice", 1, 8)
+
+        self.assertEqual(self.game["ships_to_place"]["alice"], 1)
+        self.assertEqual(self.game["ships_afloat"]["alice"], 4)
+        self.assertNotIn((0, 8), self.game["ship_cells"]["alice"])
+        self.assertEqual(
+            self.engine.set_ready("game", "alice")["result"],
+            "YOU MUST PLACE ALL SHIPS FIRST"
+        )
+
+        self.engine.place_ships("game", "alice", 0, 8, 5, "horizontal")
+        self.assertEqual(
+            self.engine.set_ready("game", "alice")["access"],
+            "public"
+        )
+
+    def test_sink_and_win(self):
+        self.place_fleet("bob")
+
+        first = self.shoot("alice", 0, 0)
+        self.assertEqual(first["value"], "X")
+        self.assertIsNone(first["sunk"])
+
+        sunk = self.shoot("alice", 1, 0)
+        self.assertEqual(sunk["sunk"], [(0, 0), (1, 0)])
+        self.assertEqual(self.game["ships_afloat"]["bob"], 4)
+        self.assertIsNone(sunk["winner"])
+
+        self.assertEqual(self.shoot("alice", 9, 9)["value"], "O")
+
+        for x, y, length in FLEET[1:]:
+            for i in range(length):
+                result = self.shoot("alice", x + i, y)
+
+        self.assertEqual(self.game["ships_afloat"]["bob"], 0)
+        self.assertEqual(result["winner"], "alice")
+        self.assertEqual(result["result"], "GAME OVER! ALICE WON!")
+
+    def test_shot_on_same_cell_is_rejected(self):
+        self.place_fleet("bob")
+        self.shoot("alice", 0, 0)
+        result = self.shoot("alice", 0, 0)
+
+        self.assertEqual(result["result"], "ALREADY SHOT THIS POSITION")
+        self.assertEqual(self.game["ship_cells"]["bob"][(0, 0)]["hits"], 1)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class AuthViewTests(TestCase):
+    """
+    Tests of the registration and login endpoints.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_register_duplicate_username(self):
+        data = {"username": "alice", "password": "s3cret-pass"}
+        response = self.client.post(reverse("register"), data, format="json")
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(username="alice")
+        self.assertTrue(user.check_password("s3cret-pass"))
+
+        response = self.client.post(reverse("register"), data, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            {"username": ["Username is already taken."]}
+        )
+        self.assertEqual(User.objects.filter(username="alice").count(), 1)
+
+    def test_login_is_throttled(self):
+        User.objects.create_user(username="bob", password="s3cret-pass")
+        data = {"username": "bob", "password": "wrong"}
+
+        for _ in range(10):
+            response = self.client.post(reverse("login"), data, format="json")
+            self.assertEqual(response.status_code, 401)
+
+        response = self.client.post(reverse("login"), data, format="json")
+        self.assertEqual(response.status_code, 429)
+
+    def test_login_throttle_ignores_client_forwarded_for(self):
+        User.objects.create_user(username="bob", password="s3cret-pass")
+        data = {"username": "bob", "password": "wrong"}
+
+        # Each request spoofs a new address; the proxy appends the real one.
+        for i in range(11):
+            response = self.client.post(
+                reverse("login"),
+                data,
+                format="json",
+                HTTP_X_FORWARDED_FOR=f"10.0.0.{i}, 203.0.113.7"
+            )
+
+        self.assertEqual(response.status_code, 429)
@@ -1,24 +1,37 @@
+import orjson
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from rest_framework import generics
 from .serializers import UserSerializer
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
-from django.views.decorators.csrf import ensure_csrf_cookie
+from django.conf import settings
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+from django.utils.decorators import method_decorator
+from django.views import View
 
-@api_view(["GET"])
-@ensure_csrf_cookie
+# The confirmation body is constant, so it is encoded once.
+_CSRF_BODY = orjson.dumps({"message": "CSRF cookie set"})
+
+@require_GET
 def get_csrf(request):
     """
     Sets a CSRF cookie for the client.
 
     Called by the frontend before making any POST requests
     to ensure CSRF protection. Returns a confirmation message.
+    The cookie is only set if the client does not have one yet;
+    CsrfViewMiddleware replaces a malformed one on its own.
     """
-    return Response({"message": "CSRF cookie set"})
+    if settings.CSRF_COOKIE_NAME not in request.COOKIES:
+        get_token(request)
+    return HttpResponse(_CSRF_BODY, content_type="application/json")
 
 class CreateUserView(generics.CreateAPIView):
     """
@@ -40,7 +53,12 @@ class LoginView(APIView):
     - Authenticates the user using Django's built-in authentication.
     - On success: logs the user in and returns a success message.
     - On failure: returns 401 Unauthorized with an error message.
+    - Rate limited per client by the "login" throttle scope, so excess
+        attempts get 429 before any password hashing is done.
     """
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "login"
+
     def post(self, request):
         username = request.data.get("username")
         password = request.data.get("password")
@@ -75,15 +93,18 @@ class LogoutView(APIView):
             status=status.HTTP_401_UNAUTHORIZED
         )
     
-class CheckAuthView(APIView):
+@method_decorator(never_cache, name="get")
+class CheckAuthView(View):
     """
     Checks if the current user is authenticated.
 
     - Accepts GET request.
     - Returns {"isAuthenticated": True} if user is logged in, else False.
+    - Plain Django view, as it needs none of DRF's request parsing,
+        content negotiation or renderers.
+    - Never cached, so the answer changes right after login or logout.
     """
     def get(self, request):
-        if request.user.is_authenticated:
-            return Response({"isAuthenticated": True})
-        else:
-            return Response({"isAuthenticated": False})
+        return JsonResponse(
+            {"isAuthenticated": request.user.is_authenticated}
+        )
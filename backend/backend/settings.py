@@ -115,6 +115,16 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# The first hasher creates new hashes; the rest only verify old ones.
+PASSWORD_HASHERS = [
+    'api.hashers.LoginPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -153,4 +163,28 @@ CHANNEL_LAYERS = {
             "hosts": [REDIS_URL],
         },
     },
-}
\ No newline at end of file
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    },
+}
+
+# Sessions are read from the Redis cache and only fall back to the
+# database on a cache miss, so authenticated requests and WebSocket
+# handshakes skip the session query.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+SESSION_CACHE_ALIAS = "default"
+
+# Throttle counters are kept in the default (Redis) cache.
+# Clients are identified by the X-Forwarded-For entry added by the
+# Nginx proxy in front of Daphne; the entries before it come from the
+# client and are ignored, so they cannot be rotated to dodge the limit.
+REST_FRAMEWORK = {
+    "DEFAULT_THROTTLE_RATES": {
+        "login": "10/min",
+    },
+    "NUM_PROXIES": 1,
+}
@@ -2,7 +2,7 @@ import Board from "../components/Board";
 import Chat from "../components/Chat";
 import { useEffect, useState } from 'react';
 import { useNavigate, useParams } from "react-router-dom";
-import { capitalizeFirstLetter } from "../utils";
+import { applyMove, capitalizeFirstLetter } from "../utils";
 
 /**
  * Game component - Handles the main game logic and UI.
@@ -66,30 +66,51 @@ function Game() {
             }, 15000);
         };
 
+        /**
+         * Apply a game state update received from the server.
+         * @param {Object} data - Game state, disconnect and restart flags
+         */
+        const applyGameState = (data) => {
+            setState(data.state);
+            const opponent = data.state.players.find(
+                p => p !== data.state.self
+            );
+            setOpponent(opponent);
+            if (data.players_disconnect[data.state.self]) {
+                navigate("/lobby", { replace: true });
+            }
+            else if (data.players_disconnect[opponent]) {
+                setOpponentLeft(true);
+            }
+            if (data.player_restart) {
+                console.log("Restart True")
+                setVoteRestart(true);
+            }
+            if (data.state.ready && data.state.opponent_ready) {
+                setBothReady(true);
+            }
+            if (data.state.winner !== null) {
+                setGameOver(true);
+            }
+        };
+
         ws.onmessage = (event) => {
             const data = JSON.parse(event.data);
 
             switch(data.type) {
                 case "game_state":
-                    setState(data.state);
-                    const opponent = data.state.players.find(
-                        p => p !== data.state.self
-                    );
-                    setOpponent(opponent);
-                    if (data.players_disconnect[data.state.self]) {
-                        navigate("/lobby", { replace: true });
-                    }
-                    else if (data.players_disconnect[opponent]) {
-                        setOpponentLeft(true);
-                    }
-                    if (data.player_restart) {
-                        console.log("Restart True")
-                        setVoteRestart(true);
-                    }
-                    if (data.state.ready && data.state.opponent_ready) {
-                        setBothReady(true);
-                    }
-                    if (data.state.winner !== null) {
+                    applyGameState(data);
+                    break;
+
+                case "snapshot":
+                    applyGameState(data.state);
+                    setMessages(prev => [...prev, data.chat_append]);
+                    break;
+
+                case "move":
+                    setState(prev => applyMove(prev, data));
+                    setMessages(prev => [...prev, data.chat_append]);
+                    if (data.winner !== null) {
                         setGameOver(true);
                     }
                     break;
@@ -98,6 +119,10 @@ function Game() {
                     setMessages(data.history);
                     break;
 
+                case "chat_append":
+                    setMessages(prev => [...prev, data.message]);
+                    break;
+
                 case "new_game":
                     setGameOver(false);
                     setVoteRestart(false);
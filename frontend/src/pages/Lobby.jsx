@@ -63,11 +63,12 @@ function Lobby({ setIsAuthenticated }) {
             const data = JSON.parse(event.data);
 
             switch(data.type) {
+                case "self":
+                    selfUserRef.current = data.username;
+                    break;
+
                 case "user_list":
                     setUsers(data.users);
-                    if (!selfUserRef.current) {
-                        selfUserRef.current = data.self;
-                    }
                     break;
 
                 case "invite_state":
@@ -101,6 +102,19 @@ function Lobby({ setIsAuthenticated }) {
                     setMessages(data.history);
                     break;
 
+                case "chat_append":
+                    // Append only messages of the currently open chat
+                    if (
+                        chatRef.current &&
+                        data.chat_id === [
+                            selfUserRef.current,
+                            chatRef.current
+                        ].sort().join("_")
+                    ) {
+                        setMessages(prev => [...prev, data.message]);
+                    }
+                    break;
+
                 case "chat_notify":
                     // Show notification if message is from another chat
                     if (data.from !== chatRef.current) {
@@ -6,4 +6,38 @@
 export const capitalizeFirstLetter = (string) => {
     if (!string) return "";
     return string.charAt(0).toUpperCase() + string.slice(1);
-}
\ No newline at end of file
+}
+/**
+ * Applies a single shot received from the server to the game state.
+ * Only the shot cell, the sunk ship, turn and winner change.
+ * @param {Object} state - Current game state
+ * @param {Object} move - Move delta (shooter, x, y, value, sunk, turn,
+ * winner)
+ * @returns {Object} Updated game state
+ */
+export const applyMove = (state, move) => {
+    const ownShot = move.shooter === state.self;
+    const hitsKey = ownShot ? "hits" : "opponent_hits";
+    const shipsKey = ownShot ? "opponent_placed_ships" : "placed_ships";
+
+    const hits = state[hitsKey].map((row, y) => (
+        y === move.y
+            ? row.map((cell, x) => (x === move.x ? move.value : cell))
+            : row
+    ));
+    const ships = move.sunk
+        ? state[shipsKey].map(ship => (
+            ship.coords.some(([x, y]) => x === move.x && y === move.y)
+                ? { ...ship, sunk: true }
+                : ship
+        ))
+        : state[shipsKey];
+
+    return {
+        ...state,
+        [hitsKey]: hits,
+        [shipsKey]: ships,
+        turn: move.turn,
+        winner: move.winner
+    };
+}